@@ -1,3 +1,109 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
 
-# Register your models here.
+from . import changes
+from .models import Room, Client, Booking
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reads the planner's row estimate from pg_class instead of
+    running an exact COUNT(*) over the whole table.
+    Filtered querysets and small tables still get an exact count.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if queryset.query.where or connection.vendor != 'postgresql':
+            return super().count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else -1
+        if estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter rendered as a text input instead of one link per value, for
+    fields with too many distinct values to list.
+    """
+    template = 'admin/meeting/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        # A single placeholder choice so the filter is displayed.
+        return ((),)
+
+    def choices(self, changelist):
+        # Only the "All" choice is used; it carries the other active filters
+        # so the input form can resubmit them.
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = [
+            (key, value) for key, value in changelist.params.items()
+            if key not in (self.parameter_name, PAGE_VAR)
+        ]
+        yield all_choice
+
+
+class RoomNameFilter(InputFilter):
+    title = 'room name'
+    parameter_name = 'room_name'
+
+    def queryset(self, request, queryset):
+        if self.value():
+            # Served by the room name prefix index and the (room, start_time) index.
+            return queryset.filter(room__name__startswith=self.value())
+        return queryset
+
+
+class ChangeBatchAdminMixin:
+    """Deletes inside changes.batch(), so the change feed gets one insert right before commit."""
+
+    def delete_model(self, request, obj):
+        with transaction.atomic(), changes.batch():
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic(), changes.batch():
+            super().delete_queryset(request, queryset)
+
+
+@admin.register(Room)
+class RoomAdmin(ChangeBatchAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'name', 'open_time', 'close_time', 'capacity')
+    search_fields = ('^name',)
+    ordering = ('name',)
+
+
+@admin.register(Client)
+class ClientAdmin(ChangeBatchAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'name')
+    search_fields = ('^name',)
+    ordering = ('name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ('id', 'room', 'client', 'start_time', 'end_time')
+    # Booking.__str__ and the room/client columns need both relations.
+    list_select_related = ('room', 'client')
+    autocomplete_fields = ('room', 'client')
+    # Range filters on start_time use its index; a date_hierarchy would run
+    # SELECT DISTINCT over the whole table to build its year links.
+    list_filter = (RoomNameFilter, ('start_time', admin.DateFieldListFilter))
+    ordering = ('-start_time',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
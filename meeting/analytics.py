@@ -0,0 +1,158 @@
+"""
+Vectorized occupancy analytics.
+
+Bookings are handled as parallel NumPy arrays of epoch seconds, binned into
+fixed-size time slots. All times are UTC and weeks start on Monday 00:00.
+"""
+import io
+
+import numpy as np
+from django.db import connections
+
+
+SECONDS_PER_DAY = 24 * 3600
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+# 1970-01-01 was a Thursday, so the first Monday 00:00 UTC is 4 days later.
+FIRST_MONDAY_EPOCH = 4 * SECONDS_PER_DAY
+# PostgreSQL's binary timestamps count microseconds from 2000-01-01 UTC.
+POSTGRES_EPOCH = 946684800
+
+# One row of a binary COPY of (bigint, timestamptz, timestamptz): a field count,
+# then a length prefix before each value. All fields are NOT NULL.
+_COPY_ROW = np.dtype([
+    ('fields', '>i2'),
+    ('room_len', '>i4'), ('room_id', '>i8'),
+    ('start_len', '>i4'), ('start', '>i8'),
+    ('end_len', '>i4'), ('end', '>i8'),
+])
+_COPY_SIGNATURE_LENGTH = 11
+
+
+def fetch_intervals(queryset):
+    """
+    Returns (room_ids, starts, ends) for a Booking queryset as int64 arrays,
+    with times in epoch seconds.
+
+    On PostgreSQL the query is streamed with a binary COPY and decoded straight
+    into NumPy, so no per-row Python objects are built.
+    """
+    rows = queryset.values_list('room_id', 'start_time', 'end_time')
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        data = np.array(
+            [(room_id, start.timestamp(), end.timestamp()) for room_id, start, end in rows],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        return data[:, 0], data[:, 1], data[:, 2]
+
+    sql, params = rows.query.sql_with_params()
+    buffer = io.BytesIO()
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(sql, params).decode()
+        cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH (FORMAT binary)', buffer)
+    data = buffer.getbuffer()
+    # Header: signature, 4-byte flags, 4-byte extension length, extension. Trailer: 2 bytes.
+    extension = int.from_bytes(data[_COPY_SIGNATURE_LENGTH + 4:_COPY_SIGNATURE_LENGTH + 8], 'big')
+    offset = _COPY_SIGNATURE_LENGTH + 8 + extension
+    count = (len(data) - offset - 2) // _COPY_ROW.itemsize
+    decoded = np.frombuffer(data, dtype=_COPY_ROW, count=count, offset=offset)
+    starts = decoded['start'] // 1000000 + POSTGRES_EPOCH
+    ends = decoded['end'] // 1000000 + POSTGRES_EPOCH
+    return decoded['room_id'].astype(np.int64), starts.astype(np.int64), ends.astype(np.int64)
+
+
+def week_window(start_epoch, end_epoch):
+    """
+    Widens [start_epoch, end_epoch) to whole Monday-to-Monday weeks.
+    Returns the aligned start and the number of weeks.
+    """
+    aligned_start = start_epoch - (start_epoch - FIRST_MONDAY_EPOCH) % SECONDS_PER_WEEK
+    weeks = max(-(-(end_epoch - aligned_start) // SECONDS_PER_WEEK), 1)
+    return aligned_start, weeks
+
+
+def busy_rooms(rooms, groups, starts, ends, n_groups, window_start, n_slots, slot_seconds):
+    """
+    Number of distinct rooms in use per (group, slot), as an (n_groups, n_slots) array.
+
+    A room is in use in every slot one of its bookings overlaps, however many of
+    them do. Bookings are sorted by room and start, and each one's first slot is
+    pushed past the slots already covered by earlier bookings of the same room, so
+    every room adds at most 1 per slot. The remaining slot ranges add +1 at their
+    first slot and -1 after their last one in a difference array (built with two
+    bincounts), and a cumulative sum along the slot axis turns that into counts.
+    """
+    width = n_slots + 1
+    valid = ends > starts
+    rooms, groups, starts, ends = rooms[valid], groups[valid], starts[valid], ends[valid]
+    if not len(starts):
+        return np.zeros((n_groups, n_slots), dtype=np.int64)
+    first = np.clip((starts - window_start) // slot_seconds, 0, n_slots)
+    # Ceiling division, so a booking ending mid-slot still occupies that slot.
+    last = np.clip(-((window_start - ends) // slot_seconds), 0, n_slots)
+    order = np.argsort(rooms * width + first, kind='stable')
+    rooms, groups, first, last = rooms[order], groups[order], first[order], last[order]
+    # Running max of `last` within each room. Offsetting each room's block by a
+    # multiple of `width` keeps the accumulate from carrying over between rooms.
+    new_room = np.concatenate(([True], rooms[1:] != rooms[:-1]))
+    offset = (np.cumsum(new_room) - 1) * width
+    covered = np.maximum.accumulate(offset + last) - offset
+    first[1:] = np.where(new_room[1:], first[1:], np.maximum(first[1:], covered[:-1]))
+    keep = last > first
+    groups, first, last = groups[keep], first[keep], last[keep]
+    diff = np.bincount(groups * width + first, minlength=n_groups * width)
+    diff -= np.bincount(groups * width + last, minlength=n_groups * width)
+    counts = diff.reshape(n_groups, width)
+    np.cumsum(counts, axis=1, out=counts)
+    return counts[:, :n_slots]
+
+
+def peak_concurrency(groups, starts, ends, n_groups):
+    """
+    Exact peak number of overlapping bookings per group, and the first epoch
+    second it is reached (-1 for groups without bookings).
+
+    Starts (+1) and ends (-1) are swept in (group, time) order; at the same instant
+    ends come first, so back-to-back bookings never overlap. Every group's events
+    sum to zero, so one cumulative sum restarts at 0 for each group and
+    maximum.reduceat takes the peak per group.
+    """
+    valid = ends > starts
+    groups, starts, ends = groups[valid], starts[valid], ends[valid]
+    peak = np.zeros(n_groups, dtype=np.int64)
+    peak_time = np.full(n_groups, -1, dtype=np.int64)
+    if not len(starts):
+        return peak, peak_time
+    event_groups = np.concatenate((groups, groups))
+    times = np.concatenate((starts, ends))
+    is_start = np.arange(len(times)) < len(starts)
+    # One int64 sort key for (group, time, end-before-start).
+    origin = times.min()
+    span = times.max() - origin + 1
+    order = np.argsort((event_groups * span + (times - origin)) * 2 + is_start)
+    event_groups, times = event_groups[order], times[order]
+    running = np.cumsum(np.where(is_start[order], 1, -1))
+    present, bounds = np.unique(event_groups, return_index=True)
+    peak[present] = np.maximum.reduceat(running, bounds)
+    at_peak = np.flatnonzero(running == peak[event_groups])
+    reached, first = np.unique(event_groups[at_peak], return_index=True)
+    peak_time[reached] = times[at_peak[first]]
+    return peak, peak_time
+
+
+def occupancy_summary(busy, group_sizes, slots_per_day):
+    """
+    Summarises week-aligned busy-room counts per group.
+
+    `group_sizes` is the number of rooms in each group; a slot's utilisation is
+    the share of those rooms in use. Returns (heatmap, utilisation): the mean
+    utilisation per hour-of-week slot with shape (n_groups, 7, slots_per_day) and
+    the overall mean utilisation.
+    """
+    n_groups, n_slots = busy.shape
+    weeks = n_slots // (7 * slots_per_day)
+    sizes = np.asarray(group_sizes, dtype=np.int64)
+    by_week = busy.reshape(n_groups, weeks, 7 * slots_per_day).sum(axis=1)
+    heatmap = by_week / (weeks * sizes[:, None])
+    utilisation = heatmap.mean(axis=1)
+    return heatmap.reshape(n_groups, 7, slots_per_day), utilisation
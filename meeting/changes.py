@@ -0,0 +1,124 @@
+"""
+Recording of the change feed (see `Change`).
+
+Saves, and deletes of rooms and clients (with their cascaded bookings), are
+recorded by the receivers in `signals`; booking deletes by `Booking.delete()`
+and the default manager's `QuerySet.delete()`. Code that bypasses model signals
+(`QuerySet.update()`, `bulk_create()`) must record its changes itself. Run
+deletes and bulk changes inside `batch()`, so their entries are written in one
+insert just before commit.
+
+Entries are read back in commit order, see `after()`.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, router
+from django.db.models import Q, Subquery
+from django.db.models.expressions import RawSQL
+
+from .models import Change
+
+
+_state = threading.local()
+
+
+@contextmanager
+def batch():
+    """
+    Buffers every change recorded inside the block and writes them with a single
+    bulk insert when it exits. Use inside `transaction.atomic()`.
+    """
+    if getattr(_state, 'buffer', None) is not None:
+        yield
+        return
+    _state.buffer = []
+    try:
+        yield
+        _write(_state.buffer)
+    finally:
+        _state.buffer = None
+
+
+def record(changes):
+    buffer = getattr(_state, 'buffer', None)
+    if buffer is not None:
+        buffer.extend(changes)
+    elif changes:
+        _write(changes)
+
+
+def _write(changes):
+    if connections[router.db_for_write(Change)].vendor == 'postgresql':
+        txid = RawSQL('txid_current()', [])
+        for change in changes:
+            change.txid = txid
+    Change.objects.bulk_create(changes)
+
+
+# Smallest transaction id still in flight apart from our own (every change with a
+# lower txid is committed or rolled back), and our own, so a transaction can read
+# what it wrote.
+_HORIZON_SQL = """
+    SELECT COALESCE((SELECT MIN(xip) FROM txid_snapshot_xip(snapshot) AS xip), txid_snapshot_xmax(snapshot)),
+           txid_current_if_assigned()
+    FROM txid_current_snapshot() AS snapshot
+"""
+
+
+def after(cursor):
+    """
+    Change entries after the `cursor` entry id (0 for all), in commit order.
+
+    Ids are taken when a change is inserted, not when it commits, so a slow
+    transaction can commit ids lower than ones already read. On PostgreSQL
+    entries are ordered by (txid, id) instead and held back while any earlier
+    transaction is in flight, so once an entry is returned nothing can commit
+    before it. Other backends (SQLite) admit one writer at a time, so ids are
+    already in commit order.
+    """
+    entries = Change.objects.all()
+    if connections[entries.db].vendor != 'postgresql':
+        return entries.filter(id__gt=cursor).order_by('id')
+    with connections[entries.db].cursor() as db_cursor:
+        db_cursor.execute(_HORIZON_SQL)
+        horizon, own_txid = db_cursor.fetchone()
+    settled = Q(txid__lt=horizon)
+    if own_txid is not None:
+        settled |= Q(txid=own_txid)
+    entries = entries.filter(settled)
+    if cursor:
+        cursor_txid = Subquery(Change.objects.filter(id=cursor).values('txid'))
+        entries = entries.filter(Q(txid__gt=cursor_txid) | Q(txid=cursor_txid, id__gt=cursor))
+    return entries.order_by('txid', 'id')
+
+
+def room_changes(room_id, action):
+    return [Change(model_name='room', object_id=room_id, action=action, room_id=room_id)]
+
+
+def booking_changes(booking_id, action, room_id, client_id, previous_room_id=None, previous_client_id=None):
+    """
+    Change entries for one booking. When it moved to another room or client, a
+    tombstone scoped to the old one comes first so feeds filtered by it drop it.
+    """
+    changes = []
+    if previous_room_id is not None and previous_room_id != room_id:
+        changes.append(Change(model_name='booking', object_id=booking_id, action=Change.DELETED,
+                              room_id=previous_room_id))
+    if previous_client_id is not None and previous_client_id != client_id:
+        changes.append(Change(model_name='booking', object_id=booking_id, action=Change.DELETED,
+                              client_id=previous_client_id))
+    changes.append(Change(model_name='booking', object_id=booking_id, action=action,
+                          room_id=room_id, client_id=client_id))
+    return changes
+
+
+def booking_tombstones(queryset):
+    """Tombstones for every booking in the queryset, built from a single query."""
+    return [
+        Change(model_name='booking', object_id=booking_id, action=Change.DELETED,
+               room_id=room_id, client_id=client_id)
+        for booking_id, room_id, client_id in queryset.values_list('id', 'room_id', 'client_id')
+    ]
+
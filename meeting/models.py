@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 
 
 class Room(models.Model):
@@ -7,6 +7,14 @@ class Room(models.Model):
     close_time = models.TimeField()
     capacity = models.IntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['capacity'], name='room_capacity_idx'),
+            models.Index(fields=['open_time', 'close_time'], name='room_hours_idx'),
+            # Pattern ops let `name LIKE 'prefix%'` use the index regardless of collation.
+            models.Index(fields=['name'], name='room_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -18,11 +26,85 @@ class Client(models.Model):
         return self.name
 
 
+class BookingQuerySet(models.QuerySet):
+    def delete(self):
+        # Imported here: the change feed module depends on these models.
+        from . import changes
+        with transaction.atomic(using=self.db), changes.batch():
+            changes.record(changes.booking_tombstones(self))
+            return super().delete()
+
+
 class Booking(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='bookings')
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='bookings')
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
 
+    # Records change feed tombstones on delete. Cascades from rooms and clients go
+    # through the plain _base_manager, so they stay a single DELETE.
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Backs date-range filtering and the admin's default ordering.
+            models.Index(fields=['start_time'], name='booking_start_idx'),
+            # Backs per-room / per-client filtering ordered by time.
+            models.Index(fields=['room', 'start_time'], name='booking_room_start_idx'),
+            models.Index(fields=['client', 'start_time'], name='booking_client_start_idx'),
+            # Overlap checks (start < t2 AND end > t1) for one room scan from t1 onwards
+            # here, instead of over the room's whole history up to t2.
+            models.Index(fields=['room', 'end_time'], name='booking_room_end_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so the change feed can tell when a booking leaves a room or client.
+        instance._loaded_scope = (instance.__dict__.get('room_id'), instance.__dict__.get('client_id'))
+        return instance
+
+    def delete(self, using=None, keep_parents=False):
+        from . import changes
+        using = using or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using), changes.batch():
+            changes.record(changes.booking_tombstones(Booking._base_manager.using(using).filter(pk=self.pk)))
+            return super().delete(using=using, keep_parents=keep_parents)
+
     def __str__(self):
         return f"{self.room.name} booked by {self.client.name} from {self.start_time} to {self.end_time}"
+
+
+class Change(models.Model):
+    """
+    An entry of the booking/room change feed. The auto-incrementing id is the
+    feed cursor; deletes are kept as tombstones.
+    `txid` is the writing PostgreSQL transaction, which orders the feed by commit.
+    `room_id` and `client_id` scope the entry for filtered feeds.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+
+    model_name = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    room_id = models.BigIntegerField(null=True)
+    client_id = models.BigIntegerField(null=True)
+    txid = models.BigIntegerField(null=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='change_txid_seq_idx'),
+            models.Index(fields=['room_id', 'txid', 'id'], name='change_room_txid_seq_idx'),
+            models.Index(fields=['client_id', 'txid', 'id'], name='change_client_txid_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.model_name} {self.object_id} {self.action}"
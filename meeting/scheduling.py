@@ -0,0 +1,79 @@
+"""
+In-memory helpers for placing many bookings at once.
+Callers load the existing bookings they care about with one range query and
+then check and reserve intervals without further database access.
+"""
+from bisect import bisect_left
+from datetime import time, timedelta
+
+from django.utils import timezone
+
+# The last second a TimeField can name; a room closing then is open until midnight.
+LAST_SECOND = time(23, 59, 59)
+
+
+def time_of_day_span(start_time, end_time):
+    """
+    Local (start, end) times of day of an interval, to compare with a room's
+    hours (see `is_open`). None if the interval does not fall within one day.
+    An interval ending at the next midnight ends at `time.max`.
+    """
+    start_time, end_time = timezone.localtime(start_time), timezone.localtime(end_time)
+    if end_time.time() == time.min and end_time.date() == start_time.date() + timedelta(days=1):
+        return start_time.time(), time.max
+    if start_time.date() != end_time.date():
+        return None
+    return start_time.time(), end_time.time()
+
+
+def is_open(room, span):
+    """
+    Whether the room is open for a whole `time_of_day_span`. A close_time of
+    00:00 or 23:59:59 means the room closes at midnight.
+    """
+    close_time = room.close_time
+    if close_time == time.min or close_time >= LAST_SECOND:
+        close_time = time.max
+    return room.open_time <= span[0] and span[1] <= close_time
+
+
+class BusyCalendar:
+    """
+    Busy intervals per room, kept sorted and non-overlapping so that a free
+    check is a single bisect.
+    """
+
+    def __init__(self, intervals=()):
+        by_room = {}
+        for room_id, start_time, end_time in intervals:
+            by_room.setdefault(room_id, []).append((start_time, end_time))
+        self._starts = {}
+        self._ends = {}
+        for room_id, room_intervals in by_room.items():
+            room_intervals.sort()
+            starts, ends = [], []
+            for start_time, end_time in room_intervals:
+                # Existing bookings may overlap each other; merge them.
+                if ends and start_time < ends[-1]:
+                    ends[-1] = max(ends[-1], end_time)
+                else:
+                    starts.append(start_time)
+                    ends.append(end_time)
+            self._starts[room_id] = starts
+            self._ends[room_id] = ends
+
+    def is_free(self, room_id, start_time, end_time):
+        starts = self._starts.get(room_id)
+        if not starts:
+            return True
+        # Intervals are disjoint, so of those starting before end_time the last one ends latest.
+        index = bisect_left(starts, end_time)
+        return index == 0 or self._ends[room_id][index - 1] <= start_time
+
+    def reserve(self, room_id, start_time, end_time):
+        """Marks a free interval (see `is_free`) as busy."""
+        starts = self._starts.setdefault(room_id, [])
+        ends = self._ends.setdefault(room_id, [])
+        index = bisect_left(starts, start_time)
+        starts.insert(index, start_time)
+        ends.insert(index, end_time)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Room, Client, Booking
+from rest_framework.permissions import SAFE_METHODS
+from .models import Room, Client, Booking, Change
 
 
 class RoomSerializer(serializers.ModelSerializer):
@@ -8,6 +9,32 @@ class RoomSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class RoomSearchSerializer(serializers.Serializer):
+    """
+    Query parameters accepted by GET /rooms.
+    `name` is a case-sensitive prefix; `open_from`/`open_until` select rooms open
+    for that whole time of day; `available_from`/`available_until` select rooms
+    with no booking overlapping that interval.
+    """
+    name = serializers.CharField(required=False)
+    min_capacity = serializers.IntegerField(required=False, min_value=0)
+    max_capacity = serializers.IntegerField(required=False, min_value=0)
+    open_from = serializers.TimeField(required=False)
+    open_until = serializers.TimeField(required=False)
+    available_from = serializers.DateTimeField(required=False)
+    available_until = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if data.get('min_capacity') is not None and data.get('max_capacity') is not None \
+                and data['min_capacity'] > data['max_capacity']:
+            raise serializers.ValidationError('min_capacity must not exceed max_capacity.')
+        if ('available_from' in data) != ('available_until' in data):
+            raise serializers.ValidationError('available_from and available_until must be given together.')
+        if 'available_from' in data and data['available_from'] >= data['available_until']:
+            raise serializers.ValidationError('available_from must be before available_until.')
+        return data
+
+
 class ClientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Client
@@ -15,10 +42,60 @@ class ClientSerializer(serializers.ModelSerializer):
 
 
 class BookingSerializer(serializers.ModelSerializer):
+    """
+    On read requests, `?fields=id,start_time` trims the response to the listed
+    fields and `?expand=room,client` embeds the related objects instead of ids.
+    Unknown names in either are a 400.
+    Views must select_related() the expansions so they are fetched in the same query.
+    """
+    expandable_fields = {
+        'room': RoomSerializer,
+        'client': ClientSerializer,
+    }
+
     class Meta:
         model = Booking
         fields = '__all__'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        for field_name in self.requested_expansions(request):
+            self.fields[field_name] = self.expandable_fields[field_name](read_only=True)
+        requested_fields = self.requested_fields(request)
+        if requested_fields:
+            invalid = requested_fields - set(self.fields)
+            if invalid:
+                raise serializers.ValidationError({'fields': [f"Invalid field names: {', '.join(sorted(invalid))}"]})
+            for field_name in set(self.fields) - requested_fields:
+                self.fields.pop(field_name)
+
+    @staticmethod
+    def requested_fields(request):
+        fields = request.query_params.get('fields')
+        if not fields:
+            return set()
+        return {name.strip() for name in fields.split(',') if name.strip()}
+
+    @classmethod
+    def requested_expansions(cls, request):
+        """Expandable fields named in `?expand=` that survive the `?fields=` selection."""
+        expand = request.query_params.get('expand')
+        if not expand:
+            return []
+        names = [name.strip() for name in expand.split(',') if name.strip()]
+        invalid = set(names) - set(cls.expandable_fields)
+        if invalid:
+            raise serializers.ValidationError({'expand': [f"Invalid expand names: {', '.join(sorted(invalid))}"]})
+        requested_fields = cls.requested_fields(request)
+        expansions = []
+        for name in names:
+            if name not in expansions and (not requested_fields or name in requested_fields):
+                expansions.append(name)
+        return expansions
+
     def validate(self, data):
         # Here you can add custom validation.
         # For example, to optionally enforce that bookings do not overlap,
@@ -30,3 +107,120 @@ class BookingSerializer(serializers.ModelSerializer):
         #     if Booking.objects.filter(room=room, start_time__lt=end_time, end_time__gt=start_time).exists():
         #         raise serializers.ValidationError('Booking overlaps with existing booking.')
         return data
+
+
+class AvailabilityProbeSerializer(serializers.Serializer):
+    """
+    A single availability probe: either a point in time (`time`) or an
+    interval (`start_time` and `end_time`) for a room.
+    """
+    room = serializers.IntegerField()
+    time = serializers.DateTimeField(required=False)
+    start_time = serializers.DateTimeField(required=False)
+    end_time = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        has_interval = 'start_time' in data or 'end_time' in data
+        if 'time' in data:
+            if has_interval:
+                raise serializers.ValidationError('Provide either time or start_time/end_time, not both.')
+            return data
+        if 'start_time' not in data or 'end_time' not in data:
+            raise serializers.ValidationError('Provide time or both start_time and end_time.')
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError('start_time must be before end_time.')
+        return data
+
+
+class OccupancyQuerySerializer(serializers.Serializer):
+    """
+    Query parameters accepted by GET /rooms/occupancy.
+    `capacity_buckets` are ascending bucket edges, e.g. "4,8,16" gives the buckets
+    0-3, 4-7, 8-15 and 16+.
+    """
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    slot_minutes = serializers.IntegerField(default=60, min_value=15, max_value=1440)
+    group_by = serializers.ChoiceField(choices=['room', 'capacity'], default='room')
+    capacity_buckets = serializers.CharField(default='4,8,16,32')
+
+    def validate_slot_minutes(self, value):
+        if 1440 % value:
+            raise serializers.ValidationError('slot_minutes must evenly divide a day.')
+        return value
+
+    def validate_capacity_buckets(self, value):
+        try:
+            edges = [int(edge) for edge in value.split(',')]
+        except ValueError:
+            raise serializers.ValidationError('capacity_buckets must be comma-separated integers.')
+        if any(edge <= 0 for edge in edges) or edges != sorted(set(edges)):
+            raise serializers.ValidationError('capacity_buckets must be positive and strictly ascending.')
+        return edges
+
+    def validate(self, data):
+        if data['start'] >= data['end']:
+            raise serializers.ValidationError('start must be before end.')
+        return data
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    """
+    Query parameters accepted by GET /changes.
+    `since` is the cursor returned by the previous call (0 for a full sync).
+    """
+    since = serializers.IntegerField(default=0, min_value=0)
+    room_id = serializers.IntegerField(required=False)
+    client_id = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(default=500, min_value=1, max_value=1000)
+
+    def validate_since(self, value):
+        if value and not Change.objects.filter(id=value).exists():
+            raise serializers.ValidationError("Unknown cursor.")
+        return value
+
+
+class RelocateBookingsSerializer(serializers.Serializer):
+    """
+    Body of POST /rooms/{room_id}/relocate.
+    Every booking of the room overlapping [start_time, end_time) is cancelled or
+    moved. Target rooms need at least `min_capacity` seats (default: the source
+    room's capacity) and can be limited to `target_rooms`.
+    """
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    action = serializers.ChoiceField(choices=['cancel', 'move'])
+    min_capacity = serializers.IntegerField(required=False, min_value=0)
+    target_rooms = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError('start_time must be before end_time.')
+        return data
+
+
+class MeetingRequestSerializer(serializers.Serializer):
+    """A meeting that needs a room: who, when and how many attendees."""
+    client = serializers.IntegerField()
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    attendees = serializers.IntegerField(min_value=1)
+
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError('start_time must be before end_time.')
+        return data
+
+
+class RoomAssignmentSerializer(serializers.Serializer):
+    """
+    Body of POST /bookings/assign.
+    With `commit` the assigned bookings are created, otherwise only proposed.
+    """
+    requests = MeetingRequestSerializer(many=True, allow_empty=False)
+    commit = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > 1000:
+            raise serializers.ValidationError('At most 1000 requests per batch.')
+        return value
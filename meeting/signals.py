@@ -0,0 +1,43 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from . import changes
+from .models import Room, Client, Booking, Change
+
+
+# Booking deliberately has no delete receivers: they would stop rooms and clients
+# from cascading to their bookings with a single DELETE. Cascaded tombstones are
+# written from one query by the receivers below; direct booking deletes record
+# theirs in Booking.delete() and BookingQuerySet.delete().
+
+
+@receiver(post_save, sender=Room)
+def room_saved(sender, instance, created, **kwargs):
+    changes.record(changes.room_changes(instance.pk, Change.CREATED if created else Change.UPDATED))
+
+
+@receiver(pre_delete, sender=Room)
+def room_deleting(sender, instance, **kwargs):
+    changes.record(
+        changes.booking_tombstones(Booking.objects.filter(room=instance))
+        + changes.room_changes(instance.pk, Change.DELETED)
+    )
+
+
+@receiver(pre_delete, sender=Client)
+def client_deleting(sender, instance, **kwargs):
+    changes.record(changes.booking_tombstones(Booking.objects.filter(client=instance)))
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    previous_room_id, previous_client_id = getattr(instance, '_loaded_scope', (None, None))
+    changes.record(changes.booking_changes(
+        instance.pk,
+        Change.CREATED if created else Change.UPDATED,
+        instance.room_id,
+        instance.client_id,
+        previous_room_id=previous_room_id,
+        previous_client_id=previous_client_id,
+    ))
+    instance._loaded_scope = (instance.room_id, instance.client_id)
@@ -1,10 +1,16 @@
 from json import JSONDecodeError
+from unittest import skipUnless
 
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import RequestsClient
 
-from meeting.models import Client  # using ORM for client creation when needed
+from meeting.analytics import busy_rooms, peak_concurrency
+from meeting.models import Booking, Change, Client, Room  # using ORM for client creation when needed
 
 
 HOST = 'http://localhost:8000/api'
@@ -303,3 +309,591 @@ class LoadDataTest(TestCase):
         data = r.json()
         self.assertIn("detail", data)
         self.assertEqual(data["detail"], "Data loaded successfully")
+
+
+class BookingAdminChangelistTest(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin_user)
+        self.room = Room.objects.create(**room_1_params)
+        self.client_obj = Client.objects.create(**client_1_params)
+        self.url = '/admin/meeting/booking/'
+
+    def _add_bookings(self, count, room=None):
+        Booking.objects.bulk_create([
+            Booking(
+                room=room or self.room,
+                client=self.client_obj,
+                start_time="2024-04-01T10:00:00Z",
+                end_time="2024-04-01T11:00:00Z"
+            )
+            for _ in range(count)
+        ])
+
+    def _changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get(self.url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('DISTINCT' in query['sql'] for query in queries))
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self._add_bookings(1)
+        baseline = self._changelist_queries()
+        self._add_bookings(20)
+        self.assertEqual(self._changelist_queries(), baseline)
+
+    def test_filter_by_room_name(self):
+        other_room = Room.objects.create(**room_2_params)
+        self._add_bookings(2)
+        self._add_bookings(3, room=other_room)
+        r = self.client.get(self.url + '?room_name=Meeting')
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.context['cl'].result_count, 3)
+        self.assertContains(r, 'name="room_name" value="Meeting"')
+
+
+class BulkRoomAvailabilityTest(TestCase):
+    def setUp(self):
+        self.client_api = RequestsClient()
+        # Create two rooms
+        room_url = HOST + '/rooms/'
+        self.room1 = self.client_api.post(room_url, data=room_1_params).json()
+        self.room2 = self.client_api.post(room_url, data=room_2_params).json()
+        # Create a client
+        self.client_obj = Client.objects.create(**client_1_params)
+        # Book the first room from 10:00 to 11:00
+        booking_data = dict(
+            room=self.room1['id'],
+            client=self.client_obj.id,
+            start_time="2024-04-01T10:00:00Z",
+            end_time="2024-04-01T11:00:00Z"
+        )
+        self.booking = self.client_api.post(HOST + '/bookings/', data=booking_data).json()
+        self.url = HOST + '/rooms/availability/'
+
+    def test_bulk_availability(self):
+        probes = [
+            dict(room=self.room1['id'], time="2024-04-01T10:30:00Z"),
+            dict(room=self.room1['id'], time="2024-04-01T11:30:00Z"),
+            dict(room=self.room1['id'], start_time="2024-04-01T10:30:00Z", end_time="2024-04-01T12:00:00Z"),
+            dict(room=self.room1['id'], start_time="2024-04-01T11:00:00Z", end_time="2024-04-01T12:00:00Z"),
+            dict(room=self.room2['id'], time="2024-04-01T10:30:00Z"),
+        ]
+        r = self.client_api.post(self.url, json=dict(probes=probes))
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        results = r.json()['results']
+        self.assertEqual([result['available'] for result in results], [False, True, False, True, True])
+        self.assertEqual(results[0]['conflicts'], [self.booking['id']])
+        self.assertEqual(results[2]['room'], self.room1['id'])
+        self.assertEqual(results[2]['start_time'], probes[2]['start_time'])
+
+    def test_bulk_availability_unknown_room(self):
+        probes = [dict(room=self.room2['id'] + 1000, time="2024-04-01T10:30:00Z")]
+        r = self.client_api.post(self.url, json=dict(probes=probes))
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_availability_invalid_interval(self):
+        probes = [dict(room=self.room1['id'], start_time="2024-04-01T12:00:00Z", end_time="2024-04-01T11:00:00Z")]
+        r = self.client_api.post(self.url, json=dict(probes=probes))
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RoomSearchTest(TestCase):
+    def setUp(self):
+        self.client_api = RequestsClient()
+        self.url = HOST + '/rooms/'
+        # Room A: 09-17, capacity 10; Room B: 08-20, capacity 5
+        self.room1 = self.client_api.post(self.url, data=room_1_params).json()
+        self.room2 = self.client_api.post(self.url, data=room_2_params).json()
+        # Book room A from 10:00 to 11:00
+        self.client_obj = Client.objects.create(**client_1_params)
+        booking_data = dict(
+            room=self.room1['id'],
+            client=self.client_obj.id,
+            start_time="2024-04-01T10:00:00Z",
+            end_time="2024-04-01T11:00:00Z"
+        )
+        self.client_api.post(HOST + '/bookings/', data=booking_data)
+
+    def _search(self, query):
+        r = self.client_api.get(self.url + '?' + query)
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        return [room['id'] for room in r.json()]
+
+    def test_filter_by_capacity(self):
+        self.assertEqual(self._search('min_capacity=6'), [self.room1['id']])
+        self.assertEqual(self._search('max_capacity=6'), [self.room2['id']])
+
+    def test_filter_by_name_prefix(self):
+        self.assertEqual(self._search('name=Meeting'), [self.room2['id']])
+        self.assertEqual(self._search('name=Room'), [])
+
+    def test_filter_by_opening_hours(self):
+        self.assertEqual(self._search('open_from=08:30:00'), [self.room2['id']])
+        self.assertEqual(self._search('open_from=09:00:00&open_until=17:00:00'),
+                         [self.room1['id'], self.room2['id']])
+        self.assertEqual(self._search('open_until=18:00:00'), [self.room2['id']])
+
+    def test_filter_by_availability(self):
+        query = 'available_from=2024-04-01T10:30:00Z&available_until=2024-04-01T12:00:00Z'
+        self.assertEqual(self._search(query), [self.room2['id']])
+        self.assertEqual(self._search(query + '&min_capacity=6'), [])
+        query = 'available_from=2024-04-01T11:00:00Z&available_until=2024-04-01T12:00:00Z'
+        self.assertEqual(self._search(query), [self.room1['id'], self.room2['id']])
+
+    def test_invalid_filter(self):
+        r = self.client_api.get(self.url + '?min_capacity=10&max_capacity=5')
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+        r = self.client_api.get(self.url + '?available_from=2024-04-01T11:00:00Z')
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingFieldsAndExpandTest(TestCase):
+    def setUp(self):
+        self.client_api = RequestsClient()
+        # Create a room and two clients
+        self.room = self.client_api.post(HOST + '/rooms/', data=room_1_params).json()
+        self.client1 = Client.objects.create(**client_1_params)
+        self.client2 = Client.objects.create(**client_2_params)
+        self.url = HOST + '/bookings/'
+        for client_obj, start_time, end_time in [
+            (self.client1, "2024-04-01T10:00:00Z", "2024-04-01T11:00:00Z"),
+            (self.client2, "2024-04-01T12:00:00Z", "2024-04-01T13:00:00Z"),
+        ]:
+            self.client_api.post(self.url, data=dict(
+                room=self.room['id'],
+                client=client_obj.id,
+                start_time=start_time,
+                end_time=end_time
+            ))
+
+    def test_sparse_fields(self):
+        r = self.client_api.get(self.url + '?fields=id,start_time')
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        for booking in r.json():
+            self.assertEqual(set(booking), {'id', 'start_time'})
+
+    def test_expand_related_objects(self):
+        r = self.client_api.get(self.url + '?expand=room,client')
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        data = sorted(r.json(), key=lambda booking: booking['id'])
+        self.assertEqual(data[0]['room'], self.room)
+        self.assertEqual(data[0]['client'], {'id': self.client1.id, 'name': self.client1.name})
+        self.assertEqual(data[1]['client']['name'], self.client2.name)
+
+    def test_expand_on_room_bookings(self):
+        r = self.client_api.get(HOST + f"/rooms/{self.room['id']}/bookings/?fields=id,client&expand=client")
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        names = sorted(booking['client']['name'] for booking in r.json())
+        self.assertEqual(names, [self.client1.name, self.client2.name])
+
+    def test_unknown_fields_are_rejected(self):
+        r = self.client_api.get(self.url + '?fields=id,foo,bar')
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(r.json(), {'fields': ['Invalid field names: bar, foo']})
+
+    def test_unknown_expansions_are_rejected(self):
+        for url in [self.url, HOST + f"/rooms/{self.room['id']}/bookings/"]:
+            r = self.client_api.get(url + '?expand=room,foo')
+            self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(r.json(), {'expand': ['Invalid expand names: foo']})
+
+    def test_expand_uses_single_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client_api.get(self.url + '?expand=room,client')
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+
+class SlotConcurrencyTest(TestCase):
+    def test_busy_rooms_count_each_room_once_per_slot(self):
+        # Two groups, four one-hour slots starting at 0; the last booking is invalid.
+        # Room 0 has two bookings in slot 0, room 1 is a second room of group 0.
+        rooms = np.array([0, 0, 1, 2, 2])
+        groups = np.array([0, 0, 0, 1, 1])
+        starts = np.array([0, 1800, 1800, 7200, 3600])
+        ends = np.array([1200, 3600, 7200, 14400, 3600])
+        busy = busy_rooms(rooms, groups, starts, ends, 2, 0, 4, 3600)
+        self.assertEqual(busy.tolist(), [[2, 1, 0, 0], [0, 0, 1, 1]])
+
+    def test_peak_concurrency_is_exact(self):
+        # Back-to-back bookings in group 0 never overlap; group 1 overlaps from 1800.
+        groups = np.array([0, 0, 1, 1])
+        starts = np.array([0, 1800, 0, 1800])
+        ends = np.array([1800, 3600, 3600, 7200])
+        peak, peak_time = peak_concurrency(groups, starts, ends, 3)
+        self.assertEqual(peak.tolist(), [1, 2, 0])
+        self.assertEqual(peak_time.tolist(), [0, 1800, -1])
+
+
+class RoomOccupancyTest(TestCase):
+    def setUp(self):
+        self.client_api = RequestsClient()
+        # Room A has capacity 10, room B capacity 5
+        self.room1 = self.client_api.post(HOST + '/rooms/', data=room_1_params).json()
+        self.room2 = self.client_api.post(HOST + '/rooms/', data=room_2_params).json()
+        self.client_obj = Client.objects.create(**client_1_params)
+        # 2024-04-01 is a Monday
+        for room, start_time, end_time in [
+            (self.room1, "2024-04-01T10:00:00Z", "2024-04-01T11:00:00Z"),
+            (self.room2, "2024-04-01T10:30:00Z", "2024-04-01T12:00:00Z"),
+        ]:
+            self.client_api.post(HOST + '/bookings/', data=dict(
+                room=room['id'],
+                client=self.client_obj.id,
+                start_time=start_time,
+                end_time=end_time
+            ))
+        self.url = HOST + '/rooms/occupancy/?start=2024-04-01T00:00:00Z&end=2024-04-08T00:00:00Z'
+
+    def test_occupancy_per_room(self):
+        r = self.client_api.get(self.url)
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        data = r.json()
+        self.assertEqual(data['start'], "2024-04-01T00:00:00Z")
+        self.assertEqual(data['end'], "2024-04-08T00:00:00Z")
+        groups = {group['room_id']: group for group in data['groups']}
+        room1 = groups[self.room1['id']]
+        self.assertEqual(len(room1['heatmap']), 7)
+        self.assertEqual(len(room1['heatmap'][0]), 24)
+        self.assertEqual(room1['heatmap'][0][10], 1.0)
+        self.assertEqual(room1['heatmap'][0][11], 0.0)
+        self.assertEqual(room1['peak_concurrency'], 1)
+        self.assertEqual(room1['peak_at'], "2024-04-01T10:00:00Z")
+        self.assertEqual(groups[self.room2['id']]['heatmap'][0][10:12], [1.0, 1.0])
+
+    def test_occupancy_per_capacity_bucket(self):
+        r = self.client_api.get(self.url + '&group_by=capacity&capacity_buckets=8')
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        groups = r.json()['groups']
+        self.assertEqual([(group['min_capacity'], group['max_capacity']) for group in groups], [(0, 7), (8, None)])
+        self.assertEqual(groups[0]['rooms'], 1)
+        self.assertEqual(groups[0]['heatmap'][0][11], 1.0)
+        self.assertEqual(groups[1]['heatmap'][0][10], 1.0)
+
+    def test_back_to_back_bookings(self):
+        for start_time, end_time in [("2024-04-01T13:00:00Z", "2024-04-01T13:30:00Z"),
+                                     ("2024-04-01T13:30:00Z", "2024-04-01T14:00:00Z")]:
+            self.client_api.post(HOST + '/bookings/', data=dict(
+                room=self.room1['id'],
+                client=self.client_obj.id,
+                start_time=start_time,
+                end_time=end_time
+            ))
+        r = self.client_api.get(self.url + '&group_by=capacity&capacity_buckets=20')
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        group = r.json()['groups'][0]
+        self.assertEqual(group['rooms'], 2)
+        self.assertEqual(group['heatmap'][0][13], 0.5)
+        self.assertEqual(group['peak_concurrency'], 2)
+        self.assertEqual(group['peak_at'], "2024-04-01T10:30:00Z")
+
+        r = self.client_api.get(self.url)
+        room1 = {group['room_id']: group for group in r.json()['groups']}[self.room1['id']]
+        self.assertEqual(room1['heatmap'][0][13], 1.0)
+        self.assertEqual(room1['peak_concurrency'], 1)
+
+    def test_invalid_slot_size(self):
+        r = self.client_api.get(self.url + '&slot_minutes=7')
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ChangeFeedTest(TestCase):
+    def setUp(self):
+        self.client_api = RequestsClient()
+        self.url = HOST + '/changes/'
+        self.room1 = self.client_api.post(HOST + '/rooms/', data=room_1_params).json()
+        self.room2 = self.client_api.post(HOST + '/rooms/', data=room_2_params).json()
+        self.client_obj = Client.objects.create(**client_1_params)
+        self.booking = self.client_api.post(HOST + '/bookings/', data=dict(
+            room=self.room1['id'],
+            client=self.client_obj.id,
+            start_time="2024-04-01T10:00:00Z",
+            end_time="2024-04-01T11:00:00Z"
+        )).json()
+
+    def _feed(self, query=''):
+        r = self.client_api.get(self.url + '?' + query)
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        return r.json()
+
+    def test_full_sync(self):
+        data = self._feed()
+        self.assertFalse(data['has_more'])
+        self.assertEqual(
+            [(change['model'], change['id'], change['action']) for change in data['changes']],
+            [('room', self.room1['id'], 'created'), ('room', self.room2['id'], 'created'),
+             ('booking', self.booking['id'], 'created')]
+        )
+        self.assertEqual(data['changes'][2]['data'], self.booking)
+        self.assertEqual(data['cursor'], data['changes'][2]['seq'])
+        self.assertEqual(self._feed(f"since={data['cursor']}")['changes'], [])
+
+    def test_updates_and_deletes_since_cursor(self):
+        cursor = self._feed()['cursor']
+        booking_url = HOST + f"/bookings/{self.booking['id']}/"
+        self.client_api.patch(booking_url, json=dict(end_time="2024-04-01T11:30:00Z"))
+        changes = self._feed(f'since={cursor}')['changes']
+        self.assertEqual([(change['id'], change['action']) for change in changes], [(self.booking['id'], 'updated')])
+        self.assertEqual(changes[0]['data']['end_time'], "2024-04-01T11:30:00Z")
+
+        self.client_api.delete(booking_url)
+        changes = self._feed(f'since={cursor}')['changes']
+        self.assertEqual([(change['id'], change['action'], change['data']) for change in changes],
+                         [(self.booking['id'], 'deleted', None)])
+
+    def test_room_feed_sees_booking_move(self):
+        cursor = self._feed(f"room_id={self.room1['id']}")['cursor']
+        booking_url = HOST + f"/bookings/{self.booking['id']}/"
+        self.client_api.patch(booking_url, json=dict(room=self.room2['id']))
+        old_room = self._feed(f"since={cursor}&room_id={self.room1['id']}")['changes']
+        self.assertEqual([(change['id'], change['action']) for change in old_room], [(self.booking['id'], 'deleted')])
+        new_room = self._feed(f"since={cursor}&room_id={self.room2['id']}")['changes']
+        self.assertEqual([(change['id'], change['action']) for change in new_room], [(self.booking['id'], 'updated')])
+        by_client = self._feed(f"since={cursor}&client_id={self.client_obj.id}")['changes']
+        self.assertEqual(by_client[0]['data']['room'], self.room2['id'])
+
+    def _add_bookings(self, room, count):
+        room_obj = Room.objects.get(id=room['id'])
+        Booking.objects.bulk_create([
+            Booking(
+                room=room_obj,
+                client=self.client_obj,
+                start_time="2024-04-02T10:00:00Z",
+                end_time="2024-04-02T11:00:00Z"
+            )
+            for _ in range(count)
+        ])
+
+    def _delete_queries(self, room):
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client_api.delete(HOST + f"/rooms/{room['id']}/")
+        self.assertEquals(r.status_code, status.HTTP_204_NO_CONTENT)
+        return len(queries)
+
+    def test_room_delete_is_set_based(self):
+        cursor = self._feed()['cursor']
+        self._add_bookings(self.room2, 1)
+        self._add_bookings(self.room1, 49)
+        baseline = self._delete_queries(self.room2)
+        self.assertEqual(self._delete_queries(self.room1), baseline)
+        self.assertLess(baseline, 10)
+        changes = self._feed(f'since={cursor}&limit=1000')['changes']
+        self.assertEqual(Booking.objects.count(), 0)
+        self.assertEqual(len(changes), 2 + 51)
+        self.assertTrue(all(change['action'] == 'deleted' for change in changes))
+        self.assertEqual([(change['model'], change['id']) for change in changes][-1], ('room', self.room1['id']))
+
+    def test_client_delete_records_booking_tombstones(self):
+        cursor = self._feed()['cursor']
+        self.client_obj.delete()
+        changes = self._feed(f'since={cursor}&room_id={self.room1["id"]}')['changes']
+        self.assertEqual([(change['id'], change['action']) for change in changes], [(self.booking['id'], 'deleted')])
+
+    def test_orm_booking_deletes_record_tombstones(self):
+        cursor = self._feed()['cursor']
+        Booking.objects.get(pk=self.booking['id']).delete()
+        self._add_bookings(self.room2, 2)
+        removed = list(Booking.objects.values_list('id', flat=True))
+        Booking.objects.filter(room_id=self.room2['id']).delete()
+        changes = self._feed(f'since={cursor}')['changes']
+        self.assertEqual([(change['id'], change['action']) for change in changes],
+                         [(booking_id, 'deleted') for booking_id in [self.booking['id']] + removed])
+
+    def test_unknown_cursor_is_rejected(self):
+        r = self.client_api.get(self.url + '?since=999999')
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', r.json())
+
+    @skipUnless(connection.vendor == 'postgresql', 'commit order comes from PostgreSQL transaction ids')
+    def test_entries_of_in_flight_transactions_are_held_back(self):
+        cursor = self._feed()['cursor']
+        # Stands in for a transaction that took an id but has not committed yet.
+        Change.objects.create(model_name='room', object_id=self.room2['id'], action=Change.UPDATED,
+                              room_id=self.room2['id'], txid=2 ** 62)
+        self.client_api.patch(HOST + f"/rooms/{self.room1['id']}/", json=dict(capacity=11))
+        changes = self._feed(f'since={cursor}')['changes']
+        self.assertEqual([(change['id'], change['action']) for change in changes], [(self.room1['id'], 'updated')])
+
+    def test_paging(self):
+        data = self._feed('limit=2')
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['changes']), 2)
+        rest = self._feed(f"since={data['cursor']}&limit=2")
+        self.assertFalse(rest['has_more'])
+        self.assertEqual([change['id'] for change in rest['changes']], [self.booking['id']])
+
+
+class RelocateRoomBookingsTest(TestCase):
+    def setUp(self):
+        self.client_api = RequestsClient()
+        room_url = HOST + '/rooms/'
+        # Source room A (capacity 10), too small room B (capacity 5) and two larger rooms
+        self.room1 = self.client_api.post(room_url, data=room_1_params).json()
+        self.room2 = self.client_api.post(room_url, data=room_2_params).json()
+        self.room3 = self.client_api.post(room_url, data=dict(room_2_params, name="Room C", capacity=12)).json()
+        self.room4 = self.client_api.post(room_url, data=dict(room_1_params, name="Room D", capacity=15)).json()
+        self.client_obj = Client.objects.create(**client_1_params)
+        self.bookings = [
+            self._book(self.room1, "2024-04-01T10:00:00Z", "2024-04-01T11:00:00Z"),
+            self._book(self.room1, "2024-04-01T10:15:00Z", "2024-04-01T10:45:00Z"),
+            self._book(self.room1, "2024-04-01T12:00:00Z", "2024-04-01T13:00:00Z"),
+            self._book(self.room1, "2024-04-02T12:00:00Z", "2024-04-02T13:00:00Z"),
+        ]
+        self.busy = self._book(self.room3, "2024-04-01T10:30:00Z", "2024-04-01T11:30:00Z")
+        self.url = HOST + f"/rooms/{self.room1['id']}/relocate/"
+        self.window = dict(start_time="2024-04-01T00:00:00Z", end_time="2024-04-02T00:00:00Z")
+
+    def _book(self, room, start_time, end_time):
+        return self.client_api.post(HOST + '/bookings/', data=dict(
+            room=room['id'],
+            client=self.client_obj.id,
+            start_time=start_time,
+            end_time=end_time
+        )).json()
+
+    def _room_of(self, booking):
+        return self.client_api.get(HOST + f"/bookings/{booking['id']}/").json()['room']
+
+    def test_move_bookings(self):
+        r = self.client_api.post(self.url, json=dict(self.window, action='move'))
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        data = r.json()
+        # 10-11 clashes with room C so goes to D; 10:15-10:45 then fits nowhere; 12-13 fits room C.
+        self.assertEqual(data['moved'], [
+            dict(booking_id=self.bookings[0]['id'], room_id=self.room4['id']),
+            dict(booking_id=self.bookings[2]['id'], room_id=self.room3['id']),
+        ])
+        self.assertEqual(data['unplaced'], [self.bookings[1]['id']])
+        self.assertEqual(self._room_of(self.bookings[0]), self.room4['id'])
+        self.assertEqual(self._room_of(self.bookings[1]), self.room1['id'])
+        self.assertEqual(self._room_of(self.bookings[3]), self.room1['id'])
+
+    def test_move_to_target_rooms(self):
+        r = self.client_api.post(self.url, json=dict(self.window, action='move', target_rooms=[self.room3['id']]))
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        data = r.json()
+        self.assertEqual([move['room_id'] for move in data['moved']], [self.room3['id']])
+        self.assertEqual(len(data['unplaced']), 2)
+
+    def test_move_booking_ending_at_midnight(self):
+        late = self._book(self.room1, "2024-04-01T23:00:00Z", "2024-04-02T00:00:00Z")
+        all_day = self.client_api.post(HOST + '/rooms/', data=dict(
+            room_1_params, name="Room E", open_time="00:00:00", close_time="23:59:59", capacity=20,
+        )).json()
+        r = self.client_api.post(self.url, json=dict(self.window, action='move', target_rooms=[all_day['id']]))
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        self.assertIn(dict(booking_id=late['id'], room_id=all_day['id']), r.json()['moved'])
+
+    def test_unknown_target_rooms(self):
+        missing = self.room4['id'] + 1000
+        r = self.client_api.post(self.url, json=dict(self.window, action='move',
+                                                     target_rooms=[self.room3['id'], missing]))
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(missing), r.json()['detail'])
+
+    @skipUnless(connection.features.has_select_for_update, 'needs row locks')
+    def test_move_locks_candidate_rooms(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client_api.post(self.url, json=dict(self.window, action='move'))
+        locked = [query['sql'] for query in queries if query['sql'].endswith('FOR UPDATE')]
+        self.assertIn('FROM "meeting_room"', locked[0])
+        self.assertIn('FROM "meeting_booking"', locked[1])
+
+    def test_cancel_bookings(self):
+        cursor = self.client_api.get(HOST + '/changes/').json()['cursor']
+        r = self.client_api.post(self.url, json=dict(self.window, action='cancel'))
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        cancelled = [booking['id'] for booking in self.bookings[:3]]
+        self.assertEqual(sorted(r.json()['cancelled']), cancelled)
+        remaining = self.client_api.get(HOST + f"/rooms/{self.room1['id']}/bookings/").json()
+        self.assertEqual([booking['id'] for booking in remaining], [self.bookings[3]['id']])
+        feed = self.client_api.get(HOST + f'/changes/?since={cursor}').json()['changes']
+        self.assertEqual(sorted((change['id'], change['action']) for change in feed),
+                         [(booking_id, 'deleted') for booking_id in cancelled])
+
+
+class AssignRoomsTest(TestCase):
+    def setUp(self):
+        self.client_api = RequestsClient()
+        # Room A: 09-17, capacity 10; Room B: 08-20, capacity 5
+        self.room1 = self.client_api.post(HOST + '/rooms/', data=room_1_params).json()
+        self.room2 = self.client_api.post(HOST + '/rooms/', data=room_2_params).json()
+        self.client_obj = Client.objects.create(**client_1_params)
+        # Room B is already booked from 10:00 to 11:00
+        self.client_api.post(HOST + '/bookings/', data=dict(
+            room=self.room2['id'],
+            client=self.client_obj.id,
+            start_time="2024-04-01T10:00:00Z",
+            end_time="2024-04-01T11:00:00Z"
+        ))
+        self.url = HOST + '/bookings/assign/'
+        self.requests = [
+            self._request("2024-04-01T10:00:00Z", "2024-04-01T11:00:00Z", 4),
+            self._request("2024-04-01T10:30:00Z", "2024-04-01T11:30:00Z", 4),
+            self._request("2024-04-01T12:00:00Z", "2024-04-01T13:00:00Z", 4),
+            self._request("2024-04-01T18:00:00Z", "2024-04-01T19:00:00Z", 4),
+            self._request("2024-04-01T12:00:00Z", "2024-04-01T13:00:00Z", 8),
+            self._request("2024-04-01T12:00:00Z", "2024-04-01T13:00:00Z", 20),
+        ]
+
+    def _request(self, start_time, end_time, attendees):
+        return dict(client=self.client_obj.id, start_time=start_time, end_time=end_time, attendees=attendees)
+
+    def test_assign_without_commit(self):
+        r = self.client_api.post(self.url, json=dict(requests=self.requests))
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        data = r.json()
+        self.assertFalse(data['committed'])
+        # B is busy at 10:00 and closed at 18:00; A is the only room for 8 attendees.
+        self.assertEqual(
+            [(assignment['index'], assignment['room']) for assignment in data['assignments']],
+            [(0, self.room1['id']), (2, self.room2['id']), (3, self.room2['id']), (4, self.room1['id'])]
+        )
+        self.assertEqual([item['index'] for item in data['unplaced']], [1, 5])
+        self.assertEqual(len(self.client_api.get(HOST + '/bookings/').json()), 1)
+
+    def test_assign_with_commit(self):
+        r = self.client_api.post(self.url, json=dict(requests=self.requests, commit=True))
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        data = r.json()
+        self.assertTrue(data['committed'])
+        bookings = {booking['id']: booking for booking in self.client_api.get(HOST + '/bookings/').json()}
+        self.assertEqual(len(bookings), 5)
+        for assignment in data['assignments']:
+            booking = bookings[assignment['booking']]
+            self.assertEqual(booking['room'], assignment['room'])
+            self.assertEqual(booking['start_time'], assignment['start_time'])
+        created = Change.objects.filter(model_name='booking', action=Change.CREATED)
+        self.assertEqual(
+            set(created.values_list('object_id', flat=True)),
+            set(bookings)
+        )
+
+    def test_assign_meeting_ending_at_midnight(self):
+        late_room = self.client_api.post(HOST + '/rooms/', data=dict(
+            room_2_params, name="Room C", close_time="00:00:00",
+        )).json()
+        r = self.client_api.post(self.url, json=dict(requests=[
+            self._request("2024-04-01T23:00:00Z", "2024-04-02T00:00:00Z", 4),
+            self._request("2024-04-01T23:00:00Z", "2024-04-02T00:30:00Z", 4),
+        ]))
+        self.assertEquals(r.status_code, status.HTTP_200_OK)
+        data = r.json()
+        self.assertEqual([(assignment['index'], assignment['room']) for assignment in data['assignments']],
+                         [(0, late_room['id'])])
+        self.assertEqual([item['index'] for item in data['unplaced']], [1])
+
+    @skipUnless(connection.features.has_select_for_update, 'needs row locks')
+    def test_commit_locks_candidate_rooms(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client_api.post(self.url, json=dict(requests=self.requests, commit=True))
+        locked = [query['sql'] for query in queries if query['sql'].endswith('FOR UPDATE')]
+        self.assertEqual(len(locked), 1)
+        self.assertIn('FROM "meeting_room"', locked[0])
+
+    def test_assign_unknown_client(self):
+        requests = [dict(self.requests[0], client=self.client_obj.id + 1000)]
+        r = self.client_api.post(self.url, json=dict(requests=requests))
+        self.assertEquals(r.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RoomViewSet, BookingViewSet, ClientBookingsReport, BookingOverlapsView, load_data
+from .views import RoomViewSet, BookingViewSet, ClientBookingsReport, BookingOverlapsView, ChangeFeedView, load_data
 
 router = DefaultRouter()
 router.register(r'rooms', RoomViewSet, basename='room')
@@ -10,5 +10,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('clients/bookings/', ClientBookingsReport.as_view(), name='client-bookings-report'),
     path('bookings/overlaps/', BookingOverlapsView.as_view(), name='booking-overlaps'),
+    path('changes/', ChangeFeedView.as_view(), name='change-feed'),
     path('load-data/', load_data, name='load-data'),
 ]
@@ -2,24 +2,85 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view
 from rest_framework.views import APIView
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.db import connections, transaction
 from django.utils.dateparse import parse_datetime
-from django.db.models import Count
-from .models import Room, Client, Booking
-from .serializers import RoomSerializer, ClientSerializer, BookingSerializer
+from django.db.models import Count, Exists, OuterRef, Q
+from . import changes
+from .analytics import (
+    SECONDS_PER_DAY, busy_rooms, fetch_intervals, occupancy_summary, peak_concurrency, week_window,
+)
+from .models import Room, Client, Booking, Change
+from .serializers import (
+    RoomSerializer, RoomSearchSerializer, ClientSerializer, BookingSerializer, AvailabilityProbeSerializer,
+    OccupancyQuerySerializer, ChangeFeedQuerySerializer, RelocateBookingsSerializer, RoomAssignmentSerializer,
+)
+from .scheduling import BusyCalendar, is_open, time_of_day_span
+
+MAX_AVAILABILITY_PROBES = 1000
+# Upper bound on groups x slots held in memory by the occupancy analytics.
+MAX_OCCUPANCY_CELLS = 10_000_000
+
+
+def _lock_room(room_id):
+    """
+    Locks a room row until the end of the transaction. Assignments and relocations
+    lock the rooms they place bookings in, so this waits for them to commit.
+    """
+    Room.objects.select_for_update().filter(pk=room_id).exists()
 
 
 class RoomViewSet(viewsets.ModelViewSet):
     """
     Handles:
-      - GET /rooms
+      - GET /rooms?name=...&min_capacity=...&open_from=...&available_from=...
       - POST /rooms
       - GET /rooms/{room_id}/bookings
       - GET /rooms/{room_id}/availability?time=...
+      - POST /rooms/{room_id}/relocate (bulk cancel/move for maintenance)
+      - POST /rooms/availability (bulk availability probes)
       - GET /rooms/usage (custom action)
+      - GET /rooms/occupancy?start=...&end=... (occupancy heatmaps)
     """
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
 
+    def perform_destroy(self, instance):
+        # Booking tombstones of the cascade are written in one insert just before commit.
+        with transaction.atomic(), changes.batch():
+            instance.delete()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        search = RoomSearchSerializer(data=self.request.query_params)
+        search.is_valid(raise_exception=True)
+        params = search.validated_data
+        if 'name' in params:
+            queryset = queryset.filter(name__startswith=params['name'])
+        if params.get('min_capacity') is not None:
+            queryset = queryset.filter(capacity__gte=params['min_capacity'])
+        if params.get('max_capacity') is not None:
+            queryset = queryset.filter(capacity__lte=params['max_capacity'])
+        if 'open_from' in params:
+            queryset = queryset.filter(open_time__lte=params['open_from'])
+        if 'open_until' in params:
+            queryset = queryset.filter(close_time__gte=params['open_until'])
+        if 'available_from' in params:
+            # Resolved as an anti-join in the same query, not per room; each room's
+            # probe scans booking_room_end_idx from available_from onwards.
+            overlapping = Booking.objects.filter(
+                room=OuterRef('pk'),
+                start_time__lt=params['available_until'],
+                end_time__gt=params['available_from'],
+            )
+            queryset = queryset.filter(~Exists(overlapping))
+        return queryset.order_by('id')
+
     @action(detail=False, methods=['get'])
     def usage(self, request):
         """
@@ -40,15 +101,96 @@ class RoomViewSet(viewsets.ModelViewSet):
             })
         return Response(usage_data)
 
+    @action(detail=False, methods=['get'])
+    def occupancy(self, request):
+        """
+        GET /rooms/occupancy?start=...&end=...&slot_minutes=60&group_by=room|capacity&capacity_buckets=4,8,16
+        Hour-of-week occupancy heatmaps, mean utilisation and peak concurrency per room
+        or per capacity bucket. The window is widened to whole weeks starting Monday 00:00 UTC.
+        Booking intervals are pulled in one query straight into arrays and binned with NumPy.
+        """
+        query = OccupancyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        slot_seconds = params['slot_minutes'] * 60
+        slots_per_day = SECONDS_PER_DAY // slot_seconds
+        window_start, weeks = week_window(int(params['start'].timestamp()), int(params['end'].timestamp()))
+        n_slots = weeks * 7 * slots_per_day
+
+        rooms = list(Room.objects.order_by('id').values_list('id', 'name', 'capacity'))
+        room_ids = np.array([room[0] for room in rooms], dtype=np.int64)
+        if params['group_by'] == 'room':
+            room_groups = np.arange(len(rooms))
+            group_sizes = np.ones(len(rooms), dtype=np.int64)
+            keys = [{'room_id': room_id, 'room_name': name} for room_id, name, _ in rooms]
+        else:
+            edges = params['capacity_buckets']
+            buckets = np.digitize([room[2] for room in rooms], edges).astype(np.int64)
+            # Only buckets that contain rooms become groups.
+            used_buckets = np.unique(buckets)
+            room_groups = np.searchsorted(used_buckets, buckets)
+            group_sizes = np.bincount(room_groups, minlength=len(used_buckets))
+            bounds = [0] + edges
+            keys = [
+                {
+                    'min_capacity': bounds[bucket],
+                    'max_capacity': edges[bucket] - 1 if bucket < len(edges) else None,
+                }
+                for bucket in used_buckets.tolist()
+            ]
+        if len(keys) * n_slots > MAX_OCCUPANCY_CELLS:
+            return Response({"detail": "Window too large for the requested slot size and grouping"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        window_start_dt = datetime.fromtimestamp(window_start, tz=timezone.utc)
+        window_end_dt = window_start_dt + timedelta(weeks=weeks)
+        booking_rooms, starts, ends = fetch_intervals(
+            Booking.objects.filter(start_time__lt=window_end_dt, end_time__gt=window_start_dt)
+        )
+
+        # Map each booking's room id to its group, dropping rooms created after the room query.
+        positions = np.minimum(np.searchsorted(room_ids, booking_rooms), max(len(room_ids) - 1, 0))
+        known = room_ids[positions] == booking_rooms if len(room_ids) else np.zeros(len(starts), dtype=bool)
+        booking_groups = room_groups[positions[known]]
+        # Clipped to the window, so peaks are only reported inside it.
+        starts = np.maximum(starts[known], window_start)
+        ends = np.minimum(ends[known], window_start + n_slots * slot_seconds)
+        busy = busy_rooms(
+            positions[known], booking_groups, starts, ends, len(keys), window_start, n_slots, slot_seconds,
+        )
+        heatmap, utilisation = occupancy_summary(busy, group_sizes, slots_per_day)
+        peak, peak_time = peak_concurrency(booking_groups, starts, ends, len(keys))
+
+        groups = []
+        for index, key in enumerate(keys):
+            peak_at = None
+            if peak[index]:
+                peak_at = datetime.fromtimestamp(int(peak_time[index]), tz=timezone.utc)
+            groups.append({
+                **key,
+                'rooms': int(group_sizes[index]),
+                'peak_concurrency': int(peak[index]),
+                'peak_at': peak_at,
+                'utilisation': round(float(utilisation[index]), 4),
+                'heatmap': np.round(heatmap[index], 3).tolist(),
+            })
+        return Response({
+            'start': window_start_dt,
+            'end': window_end_dt,
+            'slot_minutes': params['slot_minutes'],
+            'group_by': params['group_by'],
+            'groups': groups,
+        })
+
     @action(detail=True, methods=['get'], url_path='bookings')
     def room_bookings(self, request, pk=None):
         """
-        GET /rooms/{room_id}/bookings
+        GET /rooms/{room_id}/bookings?fields=...&expand=room,client
         List bookings for a specific room.
         """
         room = self.get_object()
-        bookings = room.bookings.all()
-        serializer = BookingSerializer(bookings, many=True)
+        bookings = room.bookings.select_related(*BookingSerializer.requested_expansions(request))
+        serializer = BookingSerializer(bookings, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='availability')
@@ -73,6 +215,140 @@ class RoomViewSet(viewsets.ModelViewSet):
             "available": available
         })
 
+    @action(detail=True, methods=['post'])
+    def relocate(self, request, pk=None):
+        """
+        POST /rooms/{room_id}/relocate
+        Cancels, or moves to other free rooms, every booking of the room that overlaps
+        the given window, in one transaction. Moves go to the smallest open, free room
+        with enough capacity; bookings that fit nowhere stay put and are reported.
+        """
+        room = self.get_object()
+        serializer = RelocateBookingsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+        if 'target_rooms' in params:
+            target_ids = set(params['target_rooms'])
+            missing = target_ids - set(Room.objects.filter(id__in=target_ids).values_list('id', flat=True))
+            if missing:
+                return Response({"detail": f"Room ids {sorted(missing)} not found"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic(), changes.batch():
+            candidates = []
+            if params['action'] == 'move':
+                candidates = Room.objects.exclude(pk=room.pk).filter(
+                    capacity__gte=params.get('min_capacity', room.capacity),
+                )
+                if 'target_rooms' in params:
+                    candidates = candidates.filter(pk__in=params['target_rooms'])
+                # Locked before their bookings are read, in the same order as assign,
+                # so concurrent writes cannot double-book a move target.
+                candidates = list(candidates.order_by('capacity', 'id').select_for_update())
+            bookings = list(room.bookings.select_for_update().filter(
+                start_time__lt=params['end_time'], end_time__gt=params['start_time'],
+            ).order_by('start_time', 'id'))
+            if params['action'] == 'cancel':
+                cancelled = [booking.id for booking in bookings]
+                Booking.objects.filter(id__in=cancelled).delete()
+                return Response({'room_id': room.id, 'action': 'cancel', 'cancelled': cancelled,
+                                 'moved': [], 'unplaced': []})
+
+            calendar = BusyCalendar()
+            if bookings and candidates:
+                # One range query for the existing bookings of every candidate room.
+                calendar = BusyCalendar(Booking.objects.filter(
+                    room_id__in=[candidate.id for candidate in candidates],
+                    start_time__lt=max(booking.end_time for booking in bookings),
+                    end_time__gt=bookings[0].start_time,
+                ).values_list('room_id', 'start_time', 'end_time'))
+
+            moves = {}
+            unplaced = []
+            for booking in bookings:
+                span = time_of_day_span(booking.start_time, booking.end_time)
+                if span is None:
+                    unplaced.append(booking.id)
+                    continue
+                for candidate in candidates:
+                    if is_open(candidate, span) and calendar.is_free(candidate.id, booking.start_time, booking.end_time):
+                        calendar.reserve(candidate.id, booking.start_time, booking.end_time)
+                        moves.setdefault(candidate.id, []).append(booking)
+                        break
+                else:
+                    unplaced.append(booking.id)
+
+            moved = []
+            for target_id, target_bookings in moves.items():
+                Booking.objects.filter(id__in=[booking.id for booking in target_bookings]).update(room_id=target_id)
+                for booking in target_bookings:
+                    # update() skips model signals, so the change feed is fed here.
+                    changes.record(changes.booking_changes(
+                        booking.id, Change.UPDATED, target_id, booking.client_id, previous_room_id=room.id,
+                    ))
+                    moved.append({'booking_id': booking.id, 'room_id': target_id})
+        moved.sort(key=lambda move: move['booking_id'])
+        return Response({'room_id': room.id, 'action': 'move', 'cancelled': [], 'moved': moved,
+                         'unplaced': unplaced})
+
+    @action(detail=False, methods=['post'], url_path='availability')
+    def bulk_availability(self, request):
+        """
+        POST /rooms/availability
+        Checks a batch of probes in one request. Each probe is either
+        {"room": id, "time": ...} or {"room": id, "start_time": ..., "end_time": ...}.
+        All probes are answered from a single query over the probed rooms and intervals.
+        """
+        probes_data = request.data.get('probes') if isinstance(request.data, dict) else None
+        if not isinstance(probes_data, list):
+            return Response({"detail": "probes must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(probes_data) > MAX_AVAILABILITY_PROBES:
+            return Response({"detail": f"At most {MAX_AVAILABILITY_PROBES} probes per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer = AvailabilityProbeSerializer(data=probes_data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        probes = serializer.validated_data
+        if not probes:
+            return Response({"results": []})
+
+        room_ids = {probe['room'] for probe in probes}
+        missing = room_ids - set(Room.objects.filter(id__in=room_ids).values_list('id', flat=True))
+        if missing:
+            return Response({"detail": f"Room ids {sorted(missing)} not found"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # A point probe uses the same inclusive bounds as the single-room check,
+        # an interval probe only conflicts with bookings that strictly overlap it.
+        # Each clause is served by booking_room_end_idx, so it reads the room's
+        # bookings from the probe onwards rather than its whole history.
+        conditions = Q()
+        for probe in probes:
+            if 'time' in probe:
+                conditions |= Q(room_id=probe['room'], start_time__lte=probe['time'], end_time__gte=probe['time'])
+            else:
+                conditions |= Q(room_id=probe['room'], start_time__lt=probe['end_time'],
+                                end_time__gt=probe['start_time'])
+        bookings_by_room = {}
+        for booking_id, room_id, start_time, end_time in Booking.objects.filter(conditions).values_list(
+                'id', 'room_id', 'start_time', 'end_time'):
+            bookings_by_room.setdefault(room_id, []).append((booking_id, start_time, end_time))
+
+        results = []
+        for probe in probes:
+            bookings = bookings_by_room.get(probe['room'], [])
+            if 'time' in probe:
+                conflicts = [booking_id for booking_id, start_time, end_time in bookings
+                             if start_time <= probe['time'] <= end_time]
+            else:
+                conflicts = [booking_id for booking_id, start_time, end_time in bookings
+                             if start_time < probe['end_time'] and end_time > probe['start_time']]
+            result = AvailabilityProbeSerializer(probe).data
+            result['available'] = not conflicts
+            result['conflicts'] = conflicts
+            results.append(result)
+        return Response({"results": results})
+
 
 class BookingViewSet(viewsets.ModelViewSet):
     """
@@ -80,20 +356,116 @@ class BookingViewSet(viewsets.ModelViewSet):
       - GET /bookings
       - POST /bookings
       - GET /bookings?client_id=...
+      - POST /bookings/assign (batch room assignment)
+      - ?fields=... and ?expand=room,client on any read
     """
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Expanded relations are joined here so serialization never queries per row.
+        return queryset.select_related(*BookingSerializer.requested_expansions(self.request))
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            _lock_room(serializer.validated_data['room'].pk)
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            _lock_room(serializer.validated_data.get('room', serializer.instance.room).pk)
+            serializer.save()
+
     def list(self, request, *args, **kwargs):
         # If a client_id is provided, filter the bookings accordingly.
         client_id = request.query_params.get('client_id')
+        bookings = self.get_queryset()
         if client_id:
-            bookings = Booking.objects.filter(client__id=client_id)
-        else:
-            bookings = Booking.objects.all()
+            bookings = bookings.filter(client__id=client_id)
         serializer = self.get_serializer(bookings, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def assign(self, request):
+        """
+        POST /bookings/assign
+        Assigns rooms to a batch of meeting requests in one pass. Requests are taken in
+        start-time order (greedy interval-graph colouring) and each gets the smallest room
+        with enough capacity that is open and free, counting existing bookings and earlier
+        assignments. Rooms and existing bookings are each fetched with a single query.
+        With "commit": true the bookings are bulk-created in one transaction.
+        """
+        serializer = RoomAssignmentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        meetings = serializer.validated_data['requests']
+        commit = serializer.validated_data['commit']
+
+        client_ids = {meeting['client'] for meeting in meetings}
+        missing = client_ids - set(Client.objects.filter(id__in=client_ids).values_list('id', flat=True))
+        if missing:
+            return Response({"detail": f"Client ids {sorted(missing)} not found"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic(), changes.batch():
+            candidates = Room.objects.filter(
+                capacity__gte=min(meeting['attendees'] for meeting in meetings),
+            ).order_by('capacity', 'id')
+            # Locking the candidate rooms makes other assignments, relocations and
+            # booking writes into them wait, so the calendar below stays current.
+            rooms = list(candidates.select_for_update() if commit else candidates)
+            capacities = [room.capacity for room in rooms]
+            calendar = BusyCalendar(Booking.objects.filter(
+                room__in=candidates,
+                start_time__lt=max(meeting['end_time'] for meeting in meetings),
+                end_time__gt=min(meeting['start_time'] for meeting in meetings),
+            ).values_list('room_id', 'start_time', 'end_time'))
+
+            assignments = []
+            unplaced = []
+            order = sorted(range(len(meetings)), key=lambda index: (
+                meetings[index]['start_time'], -meetings[index]['attendees'], meetings[index]['end_time'],
+            ))
+            for index in order:
+                meeting = meetings[index]
+                span = time_of_day_span(meeting['start_time'], meeting['end_time'])
+                if span is None:
+                    unplaced.append({'index': index, 'reason': 'Meeting spans more than one day'})
+                    continue
+                # Rooms are sorted by capacity, so the first match is the tightest fit.
+                for room in rooms[bisect_left(capacities, meeting['attendees']):]:
+                    if is_open(room, span) and calendar.is_free(room.id, meeting['start_time'], meeting['end_time']):
+                        calendar.reserve(room.id, meeting['start_time'], meeting['end_time'])
+                        assignments.append(dict(meeting, index=index, room=room.id))
+                        break
+                else:
+                    unplaced.append({'index': index, 'reason': 'No open, free room with enough capacity'})
+
+            if commit and assignments:
+                bookings = [
+                    Booking(room_id=assignment['room'], client_id=assignment['client'],
+                            start_time=assignment['start_time'], end_time=assignment['end_time'])
+                    for assignment in assignments
+                ]
+                if connections[Booking.objects.db].features.can_return_rows_from_bulk_insert:
+                    Booking.objects.bulk_create(bookings)
+                    for booking in bookings:
+                        # bulk_create() skips model signals, so the change feed is fed here.
+                        changes.record(changes.booking_changes(
+                            booking.id, Change.CREATED, booking.room_id, booking.client_id,
+                        ))
+                else:
+                    # Without primary keys from bulk_create(), save one by one;
+                    # post_save records the changes.
+                    for booking in bookings:
+                        booking.save()
+                for assignment, booking in zip(assignments, bookings):
+                    assignment['booking'] = booking.id
+
+        assignments.sort(key=lambda assignment: assignment['index'])
+        unplaced.sort(key=lambda item: item['index'])
+        return Response({'committed': commit, 'assignments': assignments, 'unplaced': unplaced})
+
 
 class BookingOverlapsView(APIView):
     """
@@ -118,6 +490,66 @@ class BookingOverlapsView(APIView):
         return Response(overlaps)
 
 
+class ChangeFeedView(APIView):
+    """
+    GET /changes?since=...&room_id=...&client_id=...&limit=...
+    Returns room and booking changes after the `since` cursor, in commit order, with
+    the current state of each changed object. Several changes to the same object
+    within a page collapse into the latest one; deletes are returned as tombstones
+    with no data. Pass the returned `cursor` as `since` on the next call.
+    """
+
+    def get(self, request):
+        query = ChangeFeedQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        entries = changes.after(params['since'])
+        if 'room_id' in params:
+            entries = entries.filter(room_id=params['room_id'])
+        if 'client_id' in params:
+            entries = entries.filter(client_id=params['client_id'])
+        entries = list(entries[:params['limit'] + 1])
+        has_more = len(entries) > params['limit']
+        entries = entries[:params['limit']]
+
+        latest = {}
+        for entry in entries:
+            latest.pop((entry.model_name, entry.object_id), None)
+            latest[(entry.model_name, entry.object_id)] = entry
+        live_ids = {'room': set(), 'booking': set()}
+        for entry in latest.values():
+            if entry.action != Change.DELETED:
+                live_ids[entry.model_name].add(entry.object_id)
+        rooms = Room.objects.in_bulk(live_ids['room'])
+        bookings = Booking.objects.in_bulk(live_ids['booking'])
+
+        feed = []
+        for entry in latest.values():
+            data = None
+            if entry.model_name == 'room':
+                obj = rooms.get(entry.object_id)
+                if obj is not None:
+                    data = RoomSerializer(obj).data
+            else:
+                obj = bookings.get(entry.object_id)
+                # A booking that has since left the filtered room or client is gone from this feed.
+                if obj is not None and params.get('room_id', obj.room_id) == obj.room_id \
+                        and params.get('client_id', obj.client_id) == obj.client_id:
+                    data = BookingSerializer(obj).data
+            feed.append({
+                'seq': entry.id,
+                'model': entry.model_name,
+                'id': entry.object_id,
+                'action': entry.action if data is not None else Change.DELETED,
+                'data': data,
+            })
+        return Response({
+            'changes': feed,
+            'cursor': entries[-1].id if entries else params['since'],
+            'has_more': has_more,
+        })
+
+
 class ClientBookingsReport(APIView):
     """
     GET /clients/bookings